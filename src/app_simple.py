@@ -5,11 +5,29 @@ from flask import Flask, render_template, jsonify, request
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from config import config
+from utils import (STATS_TTL, content_preview, invalidate_stats_cache, ojson,
+                   split_tags, stats_cache)
 import os
 
 # Initialize Flask extensions
 db = SQLAlchemy()
 
+# Parsed once at import time; create_app may run repeatedly (tests, workers)
+_ALLOWED_ORIGINS = tuple(os.environ.get('ALLOWED_ORIGINS', 'http://localhost:*').split(','))
+
+# Small pool for fire-and-forget filesystem work (file deletes)
+from concurrent.futures import ThreadPoolExecutor
+_io_pool = ThreadPoolExecutor(max_workers=4)
+
+def _safe_unlink(file_path):
+    """Remove a file without letting errors escape the worker thread"""
+    try:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+            print(f"Deleted file: {file_path}")
+    except OSError as e:
+        print(f"Warning: Could not delete file {file_path}: {e}")
+
 def create_app(config_name=None):
     """Application factory with security enhancements"""
     
@@ -27,7 +45,7 @@ def create_app(config_name=None):
     
     # Configure CORS securely
     CORS(app, 
-         origins=os.environ.get('ALLOWED_ORIGINS', 'http://localhost:*').split(','),
+         origins=list(_ALLOWED_ORIGINS),
          methods=['GET', 'POST', 'PUT', 'DELETE'],
          allow_headers=['Content-Type', 'Authorization', 'X-API-Key']
     )
@@ -58,6 +76,67 @@ def create_app(config_name=None):
             print("✅ Database tables created successfully")
         except Exception as e:
             print(f"❌ Database initialization error: {e}")
+
+        # Covering index so stats queries can be answered from the index alone
+        try:
+            from db_pool import get_conn
+            get_conn().execute("CREATE INDEX IF NOT EXISTS idx_doc_size ON document(file_size)")
+            # Supports keyset pagination on the documents listing
+            get_conn().execute("CREATE INDEX IF NOT EXISTS idx_doc_upload ON document(upload_date DESC, id DESC)")
+            # Partial index for the "has readable content" predicate in query routes
+            get_conn().execute("""
+                CREATE INDEX IF NOT EXISTS idx_doc_has_content ON document(id)
+                WHERE content IS NOT NULL AND content <> ''
+            """)
+            # Cache of extraction + AI results keyed by upload content hash
+            get_conn().execute("""
+                CREATE TABLE IF NOT EXISTS pdf_cache (
+                    hash TEXT PRIMARY KEY,
+                    content TEXT,
+                    summary TEXT,
+                    keywords TEXT
+                )
+            """)
+            # Refresh planner statistics so the new indexes actually get picked
+            get_conn().execute("ANALYZE")
+        except Exception as e:
+            print(f"Warning: Could not create indexes: {e}")
+
+        # Full-text index used to pick the most relevant documents for AI queries
+        try:
+            from db_pool import get_conn
+            conn = get_conn()
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS document_fts
+                USING fts5(content, content=document, content_rowid=id)
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS document_fts_ai AFTER INSERT ON document BEGIN
+                    INSERT INTO document_fts(rowid, content) VALUES (new.id, new.content);
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS document_fts_ad AFTER DELETE ON document BEGIN
+                    INSERT INTO document_fts(document_fts, rowid, content)
+                    VALUES ('delete', old.id, old.content);
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS document_fts_au AFTER UPDATE ON document BEGIN
+                    INSERT INTO document_fts(document_fts, rowid, content)
+                    VALUES ('delete', old.id, old.content);
+                    INSERT INTO document_fts(rowid, content) VALUES (new.id, new.content);
+                END
+            """)
+
+            # Backfill once if the index is empty but documents already exist
+            fts_count = conn.execute("SELECT COUNT(*) FROM document_fts").fetchone()[0]
+            doc_count = conn.execute("SELECT COUNT(*) FROM document").fetchone()[0]
+            if fts_count == 0 and doc_count > 0:
+                conn.execute("INSERT INTO document_fts(document_fts) VALUES ('rebuild')")
+            conn.commit()
+        except Exception as e:
+            print(f"Warning: Could not set up full-text index: {e}")
     
     # Main routes for HTML pages
     @app.route('/')
@@ -83,95 +162,146 @@ def create_app(config_name=None):
     def api_documents():
         """Direct documents endpoint using SQLite"""
         try:
-            documents_data = []
-            
-            # Get pagination parameters
+            import base64
+
+            # Get pagination parameters (keyset cursor preferred, page kept for old clients)
+            cursor_param = request.args.get('cursor')
             page = request.args.get('page', 1, type=int)
             per_page = request.args.get('per_page', 10, type=int)
-            
-            # Direct SQLite query
-            import sqlite3
-            import os
-            
-            db_path = os.path.join(os.path.dirname(__file__), 'instance', 'pdf_api.db')
-            conn = sqlite3.connect(db_path)
+
+            # ?fields=summary narrows the projection to what the dashboard
+            # list actually renders, cutting row size and page reads
+            summary_only = request.args.get('fields', 'full') == 'summary'
+            if summary_only:
+                select_cols = "id, filename, file_size, upload_date"
+            else:
+                select_cols = """id, filename, original_filename, file_path,
+                           substr(content, 1, 201), length(content),
+                           file_size, upload_date, description, tags"""
+
+            # Direct SQLite query on the shared per-thread connection
+            from db_pool import get_conn
+
+            conn = get_conn()
             cursor = conn.cursor()
-            
+
             # Get total count
             cursor.execute("SELECT COUNT(*) FROM document")
             total_result = cursor.fetchone()
             total = total_result[0] if total_result else 0
-            
-            # Get documents with pagination
-            offset = (page - 1) * per_page
-            cursor.execute("""
-                SELECT id, filename, original_filename, file_path, content, 
-                       file_size, upload_date, description, tags 
-                FROM document 
-                ORDER BY upload_date DESC 
-                LIMIT ? OFFSET ?
-            """, (per_page, offset))
-            
-            rows = cursor.fetchall()
-            
-            for row in rows:
-                doc_data = {
+
+            if cursor_param:
+                # Keyset (seek) pagination: resume after the last (upload_date, id) seen,
+                # so deep pages cost the same as the first page
+                try:
+                    last_date, last_id = base64.urlsafe_b64decode(cursor_param.encode()).decode().rsplit('|', 1)
+                    last_id = int(last_id)
+                except (ValueError, UnicodeDecodeError):
+                    return ojson({'error': 'Invalid cursor'}, 400)
+
+                cursor.execute(f"""
+                    SELECT {select_cols}
+                    FROM document
+                    WHERE (upload_date, id) < (?, ?)
+                    ORDER BY upload_date DESC, id DESC
+                    LIMIT ?
+                """, (last_date, last_id, per_page))
+            else:
+                # Legacy page-numbered access falls back to OFFSET
+                offset = (page - 1) * per_page
+                cursor.execute(f"""
+                    SELECT {select_cols}
+                    FROM document
+                    ORDER BY upload_date DESC, id DESC
+                    LIMIT ? OFFSET ?
+                """, (per_page, offset))
+
+            # Fetch the page in one batch and build the dicts in a single
+            # comprehension instead of a per-row append loop
+            cursor.arraysize = per_page
+            rows = cursor.fetchmany(per_page)
+
+            if summary_only:
+                date_idx = 3
+                documents_data = [{
+                    'id': row[0],
+                    'filename': row[1],
+                    'file_size': row[2],
+                    'upload_date': row[3]
+                } for row in rows]
+            else:
+                date_idx = 7
+                documents_data = [{
                     'id': row[0],
                     'filename': row[1],
                     'original_filename': row[2],
                     'file_path': row[3],
-                    'content': row[4][:200] + '...' if row[4] and len(row[4]) > 200 else row[4],  # Truncate content for display
-                    'file_size': row[5],
-                    'upload_date': row[6],
-                    'description': row[7],
-                    'tags': row[8].split(',') if row[8] else []
-                }
-                documents_data.append(doc_data)
-            
-            conn.close()
-            
+                    'content': content_preview(row[4], row[5]),
+                    'file_size': row[6],
+                    'upload_date': row[7],
+                    'description': row[8],
+                    'tags': split_tags(row[9])
+                } for row in rows]
+
             pages = (total + per_page - 1) // per_page if total > 0 else 1
-            
-            return jsonify({
+
+            # Cursor for the next page, if this page was full
+            next_cursor = None
+            if len(rows) == per_page:
+                last_row = rows[-1]
+                next_cursor = base64.urlsafe_b64encode(
+                    f"{last_row[date_idx]}|{last_row[0]}".encode()
+                ).decode()
+
+            return ojson({
                 'documents': documents_data,
                 'total': total,
                 'page': page,
                 'pages': pages,
-                'per_page': per_page
-            }), 200
+                'per_page': per_page,
+                'next_cursor': next_cursor
+            }, 200)
             
         except Exception as e:
             print(f"Error in documents endpoint: {str(e)}")
-            return jsonify({'error': f'Database query failed: {str(e)}'}), 500
+            return ojson({'error': f'Database query failed: {str(e)}'}, 500)
     
     # Documents stats endpoint
     @app.route('/api/documents/stats', methods=['GET'])
     def api_documents_stats():
         """Get document statistics"""
         try:
-            import sqlite3
-            import os
-            
-            db_path = os.path.join(os.path.dirname(__file__), 'instance', 'pdf_api.db')
-            conn = sqlite3.connect(db_path)
+            import time
+            from db_pool import get_conn
+
+            # Serve from cache while it is fresh
+            if stats_cache['v'] is not None and time.time() - stats_cache['t'] < STATS_TTL:
+                return jsonify(stats_cache['v']), 200
+
+            conn = get_conn()
             cursor = conn.cursor()
-            
-            # Get total document count
-            cursor.execute("SELECT COUNT(*) FROM document")
-            total_documents = cursor.fetchone()[0]
-            
-            # Get total file size
-            cursor.execute("SELECT SUM(file_size) FROM document")
-            total_size_result = cursor.fetchone()
-            total_size = total_size_result[0] if total_size_result[0] else 0
-            
-            conn.close()
-            
-            return jsonify({
+
+            # Get count and total size in a single query
+            cursor.execute("SELECT COUNT(*), COALESCE(SUM(file_size), 0) FROM document")
+            total_documents, total_size = cursor.fetchone()
+
+            stats = {
                 'total_documents': total_documents,
                 'total_size': total_size,
                 'total_size_mb': round(total_size / (1024 * 1024), 2) if total_size else 0
-            }), 200
+            }
+
+            # Effectiveness of the upload content-hash extraction cache
+            try:
+                from routes.upload_simple import _cache_counters
+                stats['pdf_cache'] = dict(_cache_counters)
+            except ImportError:
+                pass
+
+            stats_cache['v'] = stats
+            stats_cache['t'] = time.time()
+
+            return jsonify(stats), 200
             
         except Exception as e:
             print(f"Error in documents stats endpoint: {str(e)}")
@@ -182,41 +312,30 @@ def create_app(config_name=None):
     def delete_document(document_id):
         """Delete a document and its file"""
         try:
-            import sqlite3
             import os
-            
-            db_path = os.path.join(os.path.dirname(__file__), 'instance', 'pdf_api.db')
-            conn = sqlite3.connect(db_path)
+            from db_pool import get_conn
+
+            conn = get_conn()
             cursor = conn.cursor()
-            
-            # First, get the document to find the file path
-            cursor.execute("SELECT file_path FROM document WHERE id = ?", (document_id,))
-            result = cursor.fetchone()
-            
-            if not result:
-                conn.close()
-                return jsonify({'error': 'Document not found'}), 404
-            
-            file_path = result[0]
-            
-            # Delete the physical file
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                    print(f"Deleted file: {file_path}")
-                except OSError as e:
-                    print(f"Warning: Could not delete file {file_path}: {e}")
-            
-            # Delete from database
-            cursor.execute("DELETE FROM document WHERE id = ?", (document_id,))
-            
-            if cursor.rowcount == 0:
-                conn.close()
+
+            # Delete the row and read back its file path in one statement,
+            # avoiding the SELECT-then-DELETE race and a second index lookup
+            cursor.execute("DELETE FROM document WHERE id = ? RETURNING file_path", (document_id,))
+            row = cursor.fetchone()
+
+            if row is None:
+                conn.rollback()
                 return jsonify({'error': 'Document not found'}), 404
-            
+
             conn.commit()
-            conn.close()
-            
+            invalidate_stats_cache()
+            file_path = row[0]
+
+            # Delete the physical file off the request thread; the DB row is
+            # already gone so the response doesn't need to wait on disk I/O
+            if file_path:
+                _io_pool.submit(_safe_unlink, file_path)
+
             return jsonify({
                 'message': 'Document deleted successfully',
                 'document_id': document_id
@@ -259,11 +378,7 @@ def create_app(config_name=None):
         except ImportError:
             print(f"Internal error: {error}")
         return jsonify({'error': 'Internal server error'}), 500
-    
-    # Create database tables
-    with app.app_context():
-        db.create_all()
-    
+
     return app
 
 if __name__ == '__main__':
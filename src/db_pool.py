@@ -0,0 +1,34 @@
+"""
+Shared SQLite connection handling for the simple routes
+
+Opening a fresh sqlite3 connection on every request pays for a file open,
+journal header read and a cold page cache each time. Instead we keep one
+connection per thread (sqlite3 connections are not thread-safe to share)
+and reuse it for the life of the worker.
+"""
+import os
+import sqlite3
+import threading
+
+# Database lives in the instance folder next to this module
+DB_PATH = os.path.join(os.path.dirname(__file__), 'instance', 'pdf_api.db')
+
+_local = threading.local()
+
+
+def get_conn():
+    """Get the per-thread SQLite connection, creating it on first use"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        # A bigger statement cache keeps the hot queries prepared across requests
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False, cached_statements=256)
+        # WAL lets readers run alongside writers; NORMAL sync is safe with WAL
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-65536")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        # Memory-map the database so reads come straight from the OS page
+        # cache without an extra copy into SQLite's buffer (256MB window)
+        conn.execute("PRAGMA mmap_size=268435456")
+        _local.conn = conn
+    return conn
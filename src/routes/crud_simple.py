@@ -21,19 +21,35 @@ def list_documents():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         
-        # Query all documents first
-        all_documents = Document.query.all()
-        
-        # Manual pagination
-        start = (page - 1) * per_page
-        end = start + per_page
-        documents = all_documents[start:end]
-        
-        total = len(all_documents)
+        # Select plain Core rows instead of hydrating full ORM objects
+        from sqlalchemy import func, select
+
+        rows = db.session.execute(
+            select(Document.id, Document.filename, Document.original_filename,
+                   Document.file_path, Document.content, Document.file_size,
+                   Document.upload_date, Document.description, Document.tags)
+            .order_by(Document.upload_date.desc())
+            .limit(per_page)
+            .offset((page - 1) * per_page)
+        ).all()
+
+        documents = [{
+            'id': row.id,
+            'filename': row.filename,
+            'original_filename': row.original_filename,
+            'file_path': row.file_path,
+            'content': row.content,
+            'file_size': row.file_size,
+            'upload_date': row.upload_date.isoformat() if row.upload_date else None,
+            'description': row.description,
+            'tags': row.tags.split(',') if row.tags else []
+        } for row in rows]
+
+        total = db.session.query(func.count(Document.id)).scalar()
         pages = (total + per_page - 1) // per_page if total > 0 else 1
         
         return jsonify({
-            'documents': [doc.to_dict() for doc in documents],
+            'documents': documents,
             'total': total,
             'page': page,
             'pages': pages,
@@ -97,10 +113,14 @@ def get_stats():
     """Get document statistics"""
     try:
         db, Document = get_db_and_model()
-        documents = Document.query.all()
-        
-        total_docs = len(documents)
-        total_size = sum(doc.file_size for doc in documents)
+
+        # Single aggregate query instead of loading every row
+        from sqlalchemy import func
+
+        total_docs, total_size = db.session.query(
+            func.count(Document.id),
+            func.coalesce(func.sum(Document.file_size), 0)
+        ).one()
         total_size_mb = round(total_size / (1024 * 1024), 2) if total_size > 0 else 0
         
         return jsonify({
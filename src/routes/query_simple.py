@@ -1,8 +1,18 @@
-from flask import Blueprint, request, jsonify
-from services.llm_service import LLMService
+import re
+
+from flask import Blueprint, request, jsonify, current_app
+from utils import content_preview, ojson, split_tags
 
 query_bp = Blueprint('query', __name__)
 
+# One service for all requests, mirroring upload_simple: the completion
+# caches and connection pools only pay off when they survive across requests
+try:
+    from services.llm_service import LLMService
+    _llm = LLMService()
+except Exception:
+    _llm = None
+
 @query_bp.route('/query', methods=['POST'])
 def query_documents():
     """Query documents with AI"""
@@ -17,31 +27,50 @@ def query_documents():
         if len(query.strip()) < 3:
             return jsonify({'error': 'Query must be at least 3 characters long'}), 400
         
-        # Get documents from database using SQLite
-        import sqlite3
-        import os
-        
-        db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'instance', 'pdf_api.db')
-        conn = sqlite3.connect(db_path)
+        # Get documents from database using the shared SQLite connection
+        from db_pool import get_conn
+
+        conn = get_conn()
         cursor = conn.cursor()
-        
+
         # Query specific document or all documents
         if document_id:
+            # Only pull the bounded context window, not the whole content column
+            max_context = current_app.config.get('MAX_CONTEXT_CHARS', 32000)
             cursor.execute("""
-                SELECT id, filename, content, description 
-                FROM document 
+                SELECT id, filename, substr(content, 1, ?), description
+                FROM document
                 WHERE id = ? AND content IS NOT NULL AND content != ''
-            """, (document_id,))
+            """, (max_context, document_id))
+            rows = cursor.fetchall()
         else:
-            cursor.execute("""
-                SELECT id, filename, content, description 
-                FROM document 
-                WHERE content IS NOT NULL AND content != ''
-            """)
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
+            # Pre-filter with the full-text index so only the most relevant
+            # documents go to the LLM instead of the whole corpus
+            rows = []
+            match_expr = ' OR '.join(re.findall(r'\w+', query))
+            if match_expr:
+                try:
+                    cursor.execute("""
+                        SELECT d.id, d.filename, d.content, d.description
+                        FROM document_fts
+                        JOIN document d ON d.id = document_fts.rowid
+                        WHERE document_fts MATCH ?
+                        ORDER BY rank
+                        LIMIT 5
+                    """, (match_expr,))
+                    rows = cursor.fetchall()
+                except Exception as e:
+                    print(f"Full-text search unavailable, using all documents: {e}")
+
+            # Fall back to every document when nothing matched (e.g. "summarize")
+            if not rows:
+                cursor.execute("""
+                    SELECT id, filename, content, description
+                    FROM document
+                    WHERE content IS NOT NULL AND content != ''
+                """)
+                rows = cursor.fetchall()
+
         if not rows:
             if document_id:
                 return jsonify({
@@ -80,10 +109,10 @@ def query_documents():
                 'answer': 'The uploaded documents do not contain readable text content.'
             }), 200
         
-        # Initialize LLM service and query documents
-        llm_service = LLMService()
-        
-        if not llm_service.is_available():
+        # Query documents through the shared LLM service
+        llm_service = _llm
+
+        if llm_service is None or not llm_service.is_available():
             return jsonify({
                 'error': 'AI service is not available. Please check Gemini API key configuration.',
                 'query': query,
@@ -92,20 +121,18 @@ def query_documents():
             }), 500
         
         # Query the documents using AI with Gemini
-        # Combine document content for context
         if len(documents_content) == 1:
             # Single document query
-            combined_context = documents_content[0]
             context_info = f"Analyzing document: {document_info[0]['filename']}"
+            answer = llm_service.query_content(query, documents_content[0])
         else:
-            # Multiple documents query
-            combined_context = "\n\n".join(documents_content)
+            # Multiple documents: feed content chunk by chunk instead of
+            # materializing one giant joined string
             context_info = f"Analyzing {len(documents_content)} documents"
-            
-        answer = llm_service.query_content(query, combined_context)
+            answer = llm_service.query_content_iter(query, iter(documents_content))
         
         if answer and not answer.startswith("Error"):
-            return jsonify({
+            return ojson({
                 'message': 'Query processed successfully',
                 'query': query,
                 'answer': answer,
@@ -116,7 +143,7 @@ def query_documents():
                 'context_info': context_info,
                 'document_id_queried': document_id if document_id else None,
                 'success': True
-            }), 200
+            }, 200)
         else:
             return jsonify({
                 'error': answer if answer else 'Unknown error occurred',
@@ -137,41 +164,36 @@ def query_documents():
 def get_documents():
     """Get all documents"""
     try:
-        import sqlite3
-        import os
-        
-        db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'instance', 'pdf_api.db')
-        conn = sqlite3.connect(db_path)
+        from db_pool import get_conn
+
+        conn = get_conn()
         cursor = conn.cursor()
-        
+
         cursor.execute("""
-            SELECT id, filename, original_filename, file_path, content, 
-                   file_size, upload_date, description, tags 
-            FROM document 
+            SELECT id, filename, original_filename, file_path,
+                   substr(content, 1, 201), length(content),
+                   file_size, upload_date, description, tags
+            FROM document
             ORDER BY upload_date DESC
         """)
-        
+
         rows = cursor.fetchall()
-        conn.close()
-        
-        documents = []
-        for row in rows:
-            doc_data = {
-                'id': row[0],
-                'filename': row[1],
-                'original_filename': row[2],
-                'file_path': row[3],
-                'content': row[4][:200] + '...' if row[4] and len(row[4]) > 200 else row[4],
-                'file_size': row[5],
-                'upload_date': row[6],
-                'description': row[7],
-                'tags': row[8].split(',') if row[8] else []
-            }
-            documents.append(doc_data)
-        
-        return jsonify({
+
+        documents = [{
+            'id': row[0],
+            'filename': row[1],
+            'original_filename': row[2],
+            'file_path': row[3],
+            'content': content_preview(row[4], row[5]),
+            'file_size': row[6],
+            'upload_date': row[7],
+            'description': row[8],
+            'tags': split_tags(row[9])
+        } for row in rows]
+        
+        return ojson({
             'documents': documents
-        }), 200
+        }, 200)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -180,35 +202,34 @@ def get_documents():
 def generate_document_summary(document_id):
     """Generate AI summary for a specific document"""
     try:
-        import sqlite3
-        import os
-        
-        db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'instance', 'pdf_api.db')
-        conn = sqlite3.connect(db_path)
+        from db_pool import get_conn
+
+        conn = get_conn()
         cursor = conn.cursor()
-        
+
+        # generate_summary only prompts with the first 4000 chars, so truncate
+        # in SQL instead of hauling a multi-MB content column out of the DB
         cursor.execute("""
-            SELECT id, filename, content FROM document WHERE id = ?
+            SELECT id, filename, substr(content, 1, 4000) FROM document WHERE id = ?
         """, (document_id,))
-        
+
         row = cursor.fetchone()
-        conn.close()
-        
+
         if not row:
             return jsonify({'error': 'Document not found'}), 404
-        
+
         document_content = row[2]
-        
+
         if not document_content:
             return jsonify({
                 'error': 'Document has no readable content',
                 'summary': None
             }), 400
         
-        # Initialize LLM service
-        llm_service = LLMService()
-        
-        if not llm_service.is_available():
+        # Use the shared LLM service
+        llm_service = _llm
+
+        if llm_service is None or not llm_service.is_available():
             return jsonify({
                 'error': 'AI service is not available',
                 'summary': None
@@ -235,35 +256,34 @@ def generate_document_summary(document_id):
 def extract_document_keywords(document_id):
     """Extract keywords from a specific document"""
     try:
-        import sqlite3
-        import os
-        
-        db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'instance', 'pdf_api.db')
-        conn = sqlite3.connect(db_path)
+        from db_pool import get_conn
+
+        conn = get_conn()
         cursor = conn.cursor()
-        
+
+        # extract_keywords only prompts with the first 4000 chars, so truncate
+        # in SQL instead of hauling a multi-MB content column out of the DB
         cursor.execute("""
-            SELECT id, filename, content FROM document WHERE id = ?
+            SELECT id, filename, substr(content, 1, 4000) FROM document WHERE id = ?
         """, (document_id,))
-        
+
         row = cursor.fetchone()
-        conn.close()
-        
+
         if not row:
             return jsonify({'error': 'Document not found'}), 404
-        
+
         document_content = row[2]
-        
+
         if not document_content:
             return jsonify({
                 'error': 'Document has no readable content',
                 'keywords': []
             }), 400
         
-        # Initialize LLM service
-        llm_service = LLMService()
-        
-        if not llm_service.is_available():
+        # Use the shared LLM service
+        llm_service = _llm
+
+        if llm_service is None or not llm_service.is_available():
             return jsonify({
                 'error': 'AI service is not available',
                 'keywords': []
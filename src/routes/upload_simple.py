@@ -1,16 +1,34 @@
 from flask import Blueprint, request, jsonify, current_app
 from werkzeug.utils import secure_filename
+from utils import invalidate_stats_cache
 import os
 import time
 
 upload_bp = Blueprint('upload', __name__)
 
-ALLOWED_EXTENSIONS = {'pdf'}
+# Heavy services are imported and constructed once at module load instead of
+# per request; the routes degrade gracefully when they are unavailable
+try:
+    from services.pdf_service import PDFService
+    _pdf = PDFService()
+except Exception:
+    _pdf = None
+
+try:
+    from services.llm_service import LLMService
+    _llm = LLMService()
+except Exception:
+    _llm = None
+
+ALLOWED_EXTENSIONS = frozenset({'pdf'})
+
+# Hit/miss counters for the content-hash extraction cache
+_cache_counters = {'hits': 0, 'misses': 0}
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    _, sep, ext = filename.rpartition('.')
+    return bool(sep) and ext.lower() in ALLOWED_EXTENSIONS
 
 @upload_bp.route('/upload', methods=['POST'])
 def upload_file():
@@ -35,54 +53,106 @@ def upload_file():
         original_filename = file.filename
         
         # Create unique filename to avoid conflicts
-        timestamp = str(int(time.time() * 1000))
+        timestamp = str(time.time_ns() // 1_000_000)
         unique_filename = f"{timestamp}_{filename}"
         
-        # Save file
+        # Save file: stream to disk in 1MB chunks, counting bytes and hashing
+        # in the same pass instead of re-stat'ing the file afterwards
+        import hashlib
+
         file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(file_path)
-        
-        # Get file size
-        file_size = os.path.getsize(file_path)
-        
-        # Extract text content from PDF
-        try:
-            from services.pdf_service import PDFService
-            pdf_service = PDFService()
-            content = pdf_service.extract_text(file_path)
-        except ImportError:
-            content = "PDF content extraction not available"
-        except Exception as e:
-            content = f"Failed to extract content: {str(e)}"
+        file_size = 0
+        hasher = hashlib.sha256()
+        with open(file_path, 'wb') as out:
+            while True:
+                chunk = file.stream.read(1 << 20)
+                if not chunk:
+                    break
+                out.write(chunk)
+                file_size += len(chunk)
+                hasher.update(chunk)
+        content_sha = hasher.hexdigest()
         
         # Get additional data from form
         description = request.form.get('description', '')
         tags = request.form.get('tags', '')
-        
-        # Auto-generate summary and keywords using AI if content is available
-        auto_summary = ""
-        auto_keywords = ""
-        
-        if content and len(content.strip()) > 50:  # Only if we have meaningful content
+
+        # Identical bytes produce identical text, summary and keywords, so
+        # check the content-hash cache before re-running extraction and AI
+        from db_pool import get_conn
+
+        conn = get_conn()
+        cursor = conn.cursor()
+
+        cached = None
+        try:
+            cursor.execute("""
+                SELECT content, summary, keywords FROM pdf_cache WHERE hash = ?
+            """, (content_sha,))
+            cached = cursor.fetchone()
+        except Exception as e:
+            print(f"Warning: pdf_cache lookup failed: {e}")
+
+        extract_ok = False
+        if cached:
+            _cache_counters['hits'] += 1
+            content = cached[0]
+            auto_summary = cached[1] or ""
+            auto_keywords = cached[2] or ""
+            extract_ok = True  # Only successful extractions get cached
+        else:
+            _cache_counters['misses'] += 1
+            auto_summary = ""
+            auto_keywords = ""
+
+            # Extract text content from PDF
+            if _pdf is None:
+                content = "PDF content extraction not available"
+            else:
+                try:
+                    content = _pdf.extract_text(file_path)
+                    extract_ok = True
+                except Exception as e:
+                    content = f"Failed to extract content: {str(e)}"
+
+        # Auto-generate summary and keywords using AI if content is available.
+        # Also runs for a cache hit whose enrichment is empty, so a document
+        # first uploaded while the LLM was down gets another chance.
+        ai_ok = False
+        if (extract_ok and not (auto_summary or auto_keywords)
+                and content and len(content.strip()) > 50):
             try:
-                from services.llm_service import LLMService
-                llm_service = LLMService()
-                
-                if llm_service.is_available():
-                    # Generate summary
-                    summary_result = llm_service.generate_summary(content, max_tokens=200)
+                if _llm is not None and _llm.is_available():
+                    # Runs summary + keyword generation concurrently
+                    summary_result, keywords_list = _llm.analyze_document(
+                        content, summary_tokens=200, keyword_tokens=50
+                    )
+                    ai_ok = True
+
                     if summary_result and "Error" not in summary_result:
                         auto_summary = summary_result
-                    
-                    # Extract keywords
-                    keywords_list = llm_service.extract_keywords(content, max_tokens=50)
+
                     if keywords_list and len(keywords_list) > 0:
                         auto_keywords = ", ".join(keywords_list[:10])  # Limit to 10 keywords
-                        
+
             except Exception as e:
                 print(f"AI processing failed: {e}")
                 # Continue without AI features
                 pass
+
+        # Remember the results for the next upload of the same bytes - but
+        # only when extraction really succeeded, so a transient failure
+        # string never becomes the permanent content for this hash. REPLACE
+        # lets a hit that just gained summary/keywords update its row.
+        if extract_ok and (not cached or (ai_ok and (auto_summary or auto_keywords))):
+            try:
+                cursor.execute("""
+                    INSERT OR REPLACE INTO pdf_cache (hash, content, summary, keywords)
+                    VALUES (?, ?, ?, ?)
+                """, (content_sha, content, auto_summary, auto_keywords))
+                conn.commit()
+            except Exception as e:
+                print(f"Warning: pdf_cache insert failed: {e}")
         
         # Combine user tags with auto-generated keywords
         final_tags = tags
@@ -97,25 +167,35 @@ def upload_file():
         if not final_description and auto_summary:
             final_description = auto_summary
         
-        # Create document record using SQLite
-        import sqlite3
-        from datetime import datetime
-        
-        db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'instance', 'pdf_api.db')
-        conn = sqlite3.connect(db_path)
+        # Create document record using the shared SQLite connection
+        from db_pool import get_conn
+        from utils import iso_now
+
+        conn = get_conn()
         cursor = conn.cursor()
-        
-        # Insert document into database
-        cursor.execute("""
-            INSERT INTO document (filename, original_filename, file_path, content, 
-                                file_size, upload_date, description, tags)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (unique_filename, original_filename, file_path, content, 
-              file_size, datetime.now().isoformat(), final_description, final_tags))
-        
-        document_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+
+        # Explicit transaction: take the write lock up front and pay one
+        # fsync for the whole insert (WAL + NORMAL sync come from the pool).
+        # The rollback matters: the pooled connection outlives this request,
+        # and an open write transaction would wedge every later upload on
+        # this thread and block all other writers.
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute("""
+                INSERT INTO document (filename, original_filename, file_path, content,
+                                    file_size, upload_date, description, tags)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (unique_filename, original_filename, file_path, content,
+                  file_size, iso_now(), final_description, final_tags))
+
+            document_id = cursor.lastrowid
+            cursor.execute("COMMIT")
+        except Exception:
+            conn.rollback()
+            raise
+
+        # Invalidate cached stats now that a new document exists
+        invalidate_stats_cache()
         
         return jsonify({
             'message': 'File uploaded successfully',
@@ -137,43 +217,240 @@ def upload_file():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@upload_bp.route('/upload/stream', methods=['POST'])
+def upload_file_stream():
+    """Upload a PDF by streaming the raw request body straight to disk
+
+    Skips Werkzeug's multipart spool-to-temp step, so large files are
+    written once instead of twice. The filename comes from the X-Filename
+    header (or ?filename=); AI summary/keywords can be generated later via
+    the per-document endpoints.
+    """
+    try:
+        original_filename = request.headers.get('X-Filename') or request.args.get('filename', '')
+        if not original_filename:
+            return jsonify({'error': 'Filename required (X-Filename header or ?filename=)'}), 400
+
+        if not allowed_file(original_filename):
+            return jsonify({'error': 'Only PDF files are allowed'}), 400
+
+        # Reject oversized uploads from the declared length before reading
+        max_length = current_app.config.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024)
+        if request.content_length and request.content_length > max_length:
+            return jsonify({'error': 'File too large'}), 413
+
+        filename = secure_filename(original_filename)
+        timestamp = str(time.time_ns() // 1_000_000)
+        unique_filename = f"{timestamp}_{filename}"
+        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename)
+
+        # Single pass: request body -> disk, counting bytes as we go
+        file_size = 0
+        with open(file_path, 'wb') as out:
+            while True:
+                chunk = request.stream.read(1 << 20)
+                if not chunk:
+                    break
+                out.write(chunk)
+                file_size += len(chunk)
+
+        if file_size == 0:
+            os.remove(file_path)
+            return jsonify({'error': 'Empty file not allowed'}), 400
+
+        # Extract text for querying; AI enrichment is left to the
+        # /documents/<id>/summary and /keywords endpoints
+        content = ''
+        if _pdf is not None:
+            try:
+                content = _pdf.extract_text(file_path)
+            except Exception as e:
+                content = f"Failed to extract content: {str(e)}"
+
+        from db_pool import get_conn
+        from utils import iso_now
+
+        conn = get_conn()
+        cursor = conn.cursor()
+        # Roll back on failure so the pooled connection is not left holding
+        # an open write transaction
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute("""
+                INSERT INTO document (filename, original_filename, file_path, content,
+                                    file_size, upload_date, description, tags)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (unique_filename, original_filename, file_path, content,
+                  file_size, iso_now(), '', ''))
+            document_id = cursor.lastrowid
+            cursor.execute("COMMIT")
+        except Exception:
+            conn.rollback()
+            raise
+
+        # Invalidate cached stats now that a new document exists
+        invalidate_stats_cache()
+
+        return jsonify({
+            'message': 'File uploaded successfully',
+            'document': {
+                'id': document_id,
+                'filename': unique_filename,
+                'original_filename': original_filename,
+                'file_path': file_path,
+                'file_size': file_size
+            }
+        }), 201
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@upload_bp.route('/upload/bulk', methods=['POST'])
+def upload_files_bulk():
+    """Upload multiple PDF files in a single request"""
+    try:
+        files = request.files.getlist('files')
+        if not files:
+            return jsonify({'error': 'No files provided'}), 400
+
+        from concurrent.futures import ThreadPoolExecutor
+        from db_pool import get_conn
+        from utils import iso_now
+
+        description = request.form.get('description', '')
+        tags = request.form.get('tags', '')
+
+        saved = []
+        errors = []
+
+        for file in files:
+            if not file.filename:
+                continue
+            if not allowed_file(file.filename):
+                errors.append({'filename': file.filename, 'error': 'Only PDF files are allowed'})
+                continue
+
+            filename = secure_filename(file.filename)
+            unique_filename = f"{time.time_ns() // 1_000_000}_{len(saved)}_{filename}"
+            file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename)
+
+            file_size = 0
+            with open(file_path, 'wb') as out:
+                while True:
+                    chunk = file.stream.read(1 << 20)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+                    file_size += len(chunk)
+
+            saved.append((unique_filename, file.filename, file_path, file_size))
+
+        if not saved:
+            return jsonify({'error': 'No valid PDF files provided', 'failed': errors}), 400
+
+        # Extract text in parallel; the parse is I/O bound per file
+        if _pdf is not None:
+            with ThreadPoolExecutor(max_workers=min(4, len(saved))) as executor:
+                contents = list(executor.map(lambda item: _pdf.extract_text(item[2]), saved))
+        else:
+            contents = ["PDF content extraction not available"] * len(saved)
+
+        upload_date = iso_now()
+        rows = [
+            (uf, of, fp, content, size, upload_date, description, tags)
+            for (uf, of, fp, size), content in zip(saved, contents)
+        ]
+
+        # One transaction for the whole batch: the fsync cost is paid once
+        # instead of once per file. Roll back on failure so the pooled
+        # connection is not left holding an open write transaction.
+        conn = get_conn()
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.executemany("""
+                INSERT INTO document (filename, original_filename, file_path, content,
+                                    file_size, upload_date, description, tags)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            cursor.execute("COMMIT")
+        except Exception:
+            conn.rollback()
+            raise
+
+        # Invalidate cached stats now that new documents exist
+        invalidate_stats_cache()
+
+        return jsonify({
+            'message': f'{len(rows)} files uploaded successfully',
+            'uploaded': [{
+                'filename': row[0],
+                'original_filename': row[1],
+                'file_size': row[4]
+            } for row in rows],
+            'failed': errors
+        }), 201
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @upload_bp.route('/upload/status/<int:document_id>', methods=['GET'])
 def get_upload_status(document_id):
     """Get upload status for a document"""
     try:
-        import sqlite3
-        
-        db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'instance', 'pdf_api.db')
-        conn = sqlite3.connect(db_path)
+        from db_pool import get_conn
+
+        conn = get_conn()
         cursor = conn.cursor()
-        
+
+        # Metadata only: content can be megabytes of text, and status polls
+        # don't need it. Full text lives at /upload/content/<id>.
         cursor.execute("""
-            SELECT id, filename, original_filename, file_path, content, 
-                   file_size, upload_date, description, tags 
+            SELECT id, filename, original_filename, file_path,
+                   file_size, upload_date, description, tags
             FROM document WHERE id = ?
         """, (document_id,))
-        
+
         row = cursor.fetchone()
-        conn.close()
-        
+
         if not row:
             return jsonify({'error': 'Document not found'}), 404
-        
+
         document_data = {
             'id': row[0],
             'filename': row[1],
             'original_filename': row[2],
             'file_path': row[3],
-            'content': row[4],
-            'file_size': row[5],
-            'upload_date': row[6],
-            'description': row[7],
-            'tags': row[8].split(',') if row[8] else []
+            'file_size': row[4],
+            'upload_date': row[5],
+            'description': row[6],
+            'tags': row[7].split(',') if row[7] else []
         }
         return jsonify({
             'status': 'completed',
             'document': document_data
         }), 200
-        
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@upload_bp.route('/upload/content/<int:document_id>', methods=['GET'])
+def get_upload_content(document_id):
+    """Get the extracted text content of a document"""
+    try:
+        from flask import Response
+        from db_pool import get_conn
+
+        conn = get_conn()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT content FROM document WHERE id = ?", (document_id,))
+        row = cursor.fetchone()
+
+        if not row:
+            return jsonify({'error': 'Document not found'}), 404
+
+        return Response(row[0] or '', mimetype='text/plain')
+
     except Exception as e:
         return jsonify({'error': str(e)}), 500
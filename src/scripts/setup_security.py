@@ -105,7 +105,6 @@ def check_dependencies():
     required_packages = [
         'flask',
         'flask-sqlalchemy',
-        'python-magic',
         'werkzeug',
         'cryptography',
         'flask-limiter'
@@ -2,21 +2,24 @@
 Enhanced file validation and security utilities
 """
 import os
-import magic
-import hashlib
-from werkzeug.utils import secure_filename
-from flask import current_app
+import secrets
+import time
+from werkzeug.utils import safe_join, secure_filename
+
+# Upload size cap, set once from app config at startup so validate_file does
+# not pay the current_app proxy + config lookup on every upload
+_MAX_CONTENT_LENGTH = 16 * 1024 * 1024
+
+def set_max_content_length(value):
+    """Cache the app's MAX_CONTENT_LENGTH (called from middleware init_app)"""
+    global _MAX_CONTENT_LENGTH
+    _MAX_CONTENT_LENGTH = value
 
 class FileValidator:
     """Enhanced file validation with multiple security checks"""
     
-    ALLOWED_EXTENSIONS = {'pdf'}
-    ALLOWED_MIME_TYPES = {
-        'application/pdf',
-        'application/x-pdf',
-        'application/x-bzpdf',
-        'application/x-gzpdf'
-    }
+    # Frozen so the allowlist cannot be mutated at runtime
+    ALLOWED_EXTENSIONS = frozenset({'pdf'})
     MAX_FILENAME_LENGTH = 100
     
     @staticmethod
@@ -54,7 +57,7 @@ class FileValidator:
         file_size = file.tell()
         file.seek(0)  # Reset file pointer
         
-        max_size = current_app.config.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024)
+        max_size = _MAX_CONTENT_LENGTH
         if file_size > max_size:
             return False, f"File too large. Maximum size: {max_size // (1024*1024)}MB", None
             
@@ -70,45 +73,56 @@ class FileValidator:
     @staticmethod
     def _has_allowed_extension(filename):
         """Check if file has allowed extension"""
-        return '.' in filename and \
-               filename.rsplit('.', 1)[1].lower() in FileValidator.ALLOWED_EXTENSIONS
+        # rpartition avoids the list allocation of rsplit; an empty separator
+        # means there was no dot at all
+        _, sep, ext = filename.rpartition('.')
+        return bool(sep) and ext.lower() in FileValidator.ALLOWED_EXTENSIONS
     
     @staticmethod
     def _validate_mime_type(file):
-        """Validate file MIME type using python-magic"""
+        """Validate file content by checking the PDF magic bytes
+
+        With a one-type allowlist a direct header comparison replaces the
+        full libmagic classifier run.
+        """
         try:
-            # Read first 2048 bytes for MIME detection
-            file_header = file.read(2048)
+            header = file.read(5)
             file.seek(0)  # Reset file pointer
-            
-            # Use python-magic to detect MIME type
-            mime_type = magic.from_buffer(file_header, mime=True)
-            return mime_type in FileValidator.ALLOWED_MIME_TYPES
-            
+            return header == b'%PDF-'
+
         except Exception:
-            # If magic fails, fall back to basic extension check
+            # If the header read fails, fall back to basic extension check
             return True
     
     @staticmethod
-    def generate_secure_filename(original_filename):
-        """Generate a secure, unique filename"""
+    def generate_secure_filename(original_filename, content_sha=None):
+        """Generate a secure, unique filename
+
+        When the caller already computed the upload's SHA256 (the streaming
+        save does), its first 8 hex chars are reused as the uniqueness tag
+        instead of hashing the filename again with MD5.
+        """
         safe_name = secure_filename(original_filename)
-        
-        # Add timestamp and hash for uniqueness
-        import time
-        timestamp = str(int(time.time() * 1000))
-        
-        # Create hash of original filename for additional uniqueness
-        file_hash = hashlib.md5(original_filename.encode()).hexdigest()[:8]
-        
+
+        # Millisecond timestamp without the float round-trip
+        timestamp = time.time_ns() // 1_000_000
+
+        # Content hash ties the name to the bytes; random tag as fallback
+        tag = (content_sha or secrets.token_hex(4))[:8]
+
         # Split filename and extension
         name, ext = os.path.splitext(safe_name)
-        
-        return f"{timestamp}_{file_hash}_{name}{ext}"
+
+        return f"{timestamp}_{tag}_{name}{ext}"
+
+# Resolved base directories, keyed by the raw base_dir argument. The upload
+# folder never moves while the app runs, so realpath() is paid once per base
+# instead of once per upload.
+_RESOLVED_BASES = {}
 
 class PathValidator:
     """Validate and sanitize file paths"""
-    
+
     @staticmethod
     def is_safe_path(base_dir, filename):
         """
@@ -116,20 +130,27 @@ class PathValidator:
         Prevents path traversal attacks
         """
         try:
-            base_dir = os.path.abspath(base_dir)
-            file_path = os.path.abspath(os.path.join(base_dir, filename))
-            
-            # Check if the file path starts with base directory
-            return file_path.startswith(base_dir)
+            base = _RESOLVED_BASES.get(base_dir)
+            if base is None:
+                base = _RESOLVED_BASES[base_dir] = os.path.realpath(base_dir)
+            file_path = os.path.realpath(os.path.join(base, filename))
+
+            # commonpath avoids the startswith prefix trap ('/a/b' matching
+            # '/a/bc') and realpath also resolves symlink escapes
+            return os.path.commonpath([base, file_path]) == base
         except Exception:
             return False
     
     @staticmethod
     def sanitize_path(base_dir, filename):
-        """Sanitize and validate file path"""
-        safe_filename = secure_filename(filename)
-        
-        if not PathValidator.is_safe_path(base_dir, safe_filename):
+        """Sanitize and validate file path
+
+        werkzeug's safe_join normalizes and traversal-checks in one call,
+        replacing the separate resolve/compare/join round trip.
+        """
+        file_path = safe_join(base_dir, secure_filename(filename))
+
+        if file_path is None:
             raise ValueError("Invalid file path detected")
-            
-        return os.path.join(base_dir, safe_filename)
+
+        return file_path
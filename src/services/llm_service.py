@@ -2,18 +2,184 @@
 Large Language Model service for AI-powered document querying
 Updated to use Google's Gemini API
 """
+import hashlib
 import os
 import json
+import re
+import logging
 import requests
+import threading
+from concurrent.futures import Future
+from itertools import islice
 from flask import current_app
+from urllib3.util import Retry
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Optional - fall back to stdlib json
+
+try:
+    import httpx
+except ImportError:
+    httpx = None  # Optional - fall back to the requests Session
+
+# Timeouts from either HTTP backend get the same retry treatment
+_TIMEOUT_ERRORS = (requests.exceptions.Timeout,)
+if httpx is not None:
+    _TIMEOUT_ERRORS = _TIMEOUT_ERRORS + (httpx.TimeoutException,)
+
+# Transient statuses worth retrying; Gemini sends 503 when overloaded and
+# 429 with a Retry-After header when rate limited
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# One session and one HTTP/2 client for the whole process. Some routes
+# construct LLMService per request, so these must live at module scope:
+# per-instance clients would leak sockets on every request and forfeit the
+# keep-alive/multiplexing they exist for.
+#
+# Backoff on transient statuses lives in the urllib3 Retry policy, which
+# honors server Retry-After headers; raise_on_status=False returns the final
+# response so its code maps to a user message.
+_session = requests.Session()
+_session.mount('https://', requests.adapters.HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=20,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=1.0,
+        status_forcelist=_RETRY_STATUSES,
+        allowed_methods=frozenset({'POST'}),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+))
+_session.headers.update({"Content-Type": "application/json"})
+
+# HTTP/2 client when httpx (and its h2 extra) is installed: all Gemini
+# traffic goes to one host, and multiplexing lets concurrent queries share a
+# connection instead of serializing on the HTTP/1.1 pool.
+_http2_client = None
+if httpx is not None:
+    try:
+        _http2_client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+            timeout=30.0
+        )
+    except Exception:
+        _http2_client = None
+
+# Completions for an identical prompt are reused for an hour; repeated
+# queries and test sweeps skip the 1-5s network round trip entirely.
+# Module scope for the same reason as the HTTP clients: per-instance state
+# would reset on every per-request construction and never hit.
+_CACHE_TTL = 3600
+_CACHE_MAX = 512
+_response_cache = {}  # key -> (expiry, result_text); insertion order = eviction order
+_cache_stats = {'hits': 0, 'misses': 0}
+
+# In-flight futures keyed by prompt hash for single-flight dedup; must be
+# process-wide or two requests with their own instances dedupe nothing
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Paraphrased questions ("What is AI?" vs "Tell me about AI") miss the exact
+# cache; with sentence-transformers installed they are matched by embedding
+# similarity instead. Optional - without the packages only exact caching runs.
+_SEM_THRESHOLD = 0.92
+_SEM_MAX = 1000
+_sem_model = None
+
+# (context_key, unit embedding, response) triples, shared process-wide so
+# per-request service construction doesn't start from an empty cache
+_sem_entries = []
+
+# Failure strings from the request path must never be cached as answers
+_ERROR_MARKERS = (
+    "AI service is not available",
+    "No response generated",
+    "API rate limit exceeded",
+    "Gemini API returned error",
+    "Request timed out",
+    "Unable to connect to Gemini API",
+)
+
+def _is_error_response(text):
+    """True when the text is a failure message rather than a completion"""
+    return any(marker in text for marker in _ERROR_MARKERS)
+
+def _get_sem_model():
+    """Lazily load the sentence embedding model, or None if unavailable"""
+    global _sem_model
+    if _sem_model is None:
+        if numpy is None:
+            _sem_model = False
+        else:
+            try:
+                from sentence_transformers import SentenceTransformer
+                _sem_model = SentenceTransformer('all-MiniLM-L6-v2')
+            except Exception:
+                _sem_model = False
+    return _sem_model or None
 
 class LLMService:
     """Service for interacting with Google's Gemini models"""
-    
+
+    # Precompiled classifiers for the fallback path; one C-level scan each
+    # instead of chained substring searches per keyword
+    SUMMARY_RE = re.compile(r'summary|summarize|what is|about')
+    TITLE_RE = re.compile(r'title|name|document')
+    SIZE_RE = re.compile(r'length|size|how long|how many')
+    # Guard for the stats short-circuit: only route a size-type query away
+    # from the LLM when it is clearly about the document itself ("how many
+    # words"), not a content question ("how many employees")
+    DOC_REF_RE = re.compile(r'document|text|content|word|character|page')
+
+    # Static prompt segments; one join with the dynamic parts replaces
+    # re-interpolating a mostly constant multi-line template per call
+    QUERY_PREFIX = ("Based on the following document content, please answer "
+                    "the user's question.\n\nDocument Content:\n")
+    QUERY_MID = "\n\nUser Question: "
+    QUERY_SUFFIX = ("\n\nPlease provide a clear, concise answer based on the "
+                    "document content. If the answer cannot be found in the "
+                    "document, please say so.")
+    SUMMARY_PREFIX = "Please provide a concise summary of the following document content:\n\n"
+    SUMMARY_SUFFIX = "\n\nSummary should be informative and capture the main points of the document."
+    KEYWORDS_PREFIX = ("Extract the most important keywords and phrases from "
+                       "the following document content. Return them as a "
+                       "comma-separated list:\n\n")
+    KEYWORDS_SUFFIX = "\n\nKeywords:"
+
     def __init__(self):
         """Initialize Gemini client"""
         self.api_key = None
         self.base_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash-latest:generateContent"
+        self.stream_url = self.base_url.replace(':generateContent', ':streamGenerateContent')
+
+        # All instances share the module-level clients; constructing the
+        # service per request must not open (or leak) new connections
+        self.session = _session
+        self._http2 = _http2_client
+
+        # Shared completion cache and counters (see module scope above)
+        self._response_cache = _response_cache
+        self.cache_stats = _cache_stats
+
+        # Shared semantic-cache entries (see module scope above)
+        self._sem_entries = _sem_entries
+
+        # Shared single-flight state (see module scope above)
+        self._inflight = _inflight
+        self._inflight_lock = _inflight_lock
+
         self._initialize_client()
     
     def _initialize_client(self):
@@ -45,100 +211,214 @@ class LLMService:
         """Check if LLM service is available"""
         return self.api_key is not None
     
-    def _make_gemini_request(self, prompt, max_tokens=500, retry_count=3):
-        """Make a request to Gemini API with retry logic"""
+    def _build_payload(self, prompt, max_tokens):
+        """Build the generateContent request body"""
+        return {
+            "contents": [{
+                "parts": [{
+                    "text": prompt
+                }]
+            }],
+            "generationConfig": {
+                "maxOutputTokens": max_tokens,
+                "temperature": 0.7,
+                "topP": 0.8,
+                "topK": 40
+            }
+        }
+
+    def _post(self, url, payload, stream=False):
+        """POST a payload, serializing with orjson when it is installed
+
+        Prompts carry up to 4000 chars of document text; orjson encodes
+        them several times faster than the stdlib json that requests uses
+        for its json= kwarg. Content-Type is already set on the session.
+
+        Non-streaming calls go over the HTTP/2 client when available;
+        streaming stays on the requests Session, whose iter_lines API the
+        SSE reader is built around.
+        """
+        if not stream and self._http2 is not None:
+            if orjson is not None:
+                return self._http2.post(url, content=orjson.dumps(payload),
+                                        headers={"Content-Type": "application/json"})
+            return self._http2.post(url, json=payload)
+
+        if orjson is not None:
+            return self.session.post(url, data=orjson.dumps(payload), stream=stream, timeout=30)
+        return self.session.post(url, json=payload, stream=stream, timeout=30)
+
+    def _make_gemini_request(self, prompt, max_tokens=500):
+        """Make a request to Gemini API
+
+        Backoff on transient failures is handled by the Retry policy on the
+        session adapter (see __init__); this method only maps the final
+        response to a user-visible message.
+        """
         if not self.is_available():
             return "AI service is not available. Please check Gemini API key configuration."
-        
+
         import time
-        
-        for attempt in range(retry_count):
-            try:
-                url = f"{self.base_url}?key={self.api_key}"
-                
-                payload = {
-                    "contents": [{
-                        "parts": [{
-                            "text": prompt
-                        }]
-                    }],
-                    "generationConfig": {
-                        "maxOutputTokens": max_tokens,
-                        "temperature": 0.7,
-                        "topP": 0.8,
-                        "topK": 40
-                    }
-                }
-                
-                headers = {
-                    "Content-Type": "application/json"
-                }
-                
-                response = requests.post(url, json=payload, headers=headers, timeout=30)
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if 'candidates' in result and len(result['candidates']) > 0:
-                        return result['candidates'][0]['content']['parts'][0]['text']
-                    else:
-                        return "No response generated from Gemini API."
-                
-                elif response.status_code == 503:
-                    # Service unavailable - retry after delay
-                    print(f"Gemini API overloaded (attempt {attempt + 1}/{retry_count}). Retrying in {2 ** attempt} seconds...")
-                    if attempt < retry_count - 1:
-                        time.sleep(2 ** attempt)  # Exponential backoff
-                        continue
-                    else:
-                        return "🤖 Gemini AI is currently experiencing high traffic. Please try again in a few minutes. The service should be available shortly."
-                
-                elif response.status_code == 429:
-                    # Rate limit - retry after delay
-                    print(f"Rate limited (attempt {attempt + 1}/{retry_count}). Retrying...")
-                    if attempt < retry_count - 1:
-                        time.sleep(5)
-                        continue
-                    else:
-                        return "API rate limit exceeded. Please wait a moment before trying again."
-                
+
+        # Exact-match cache: the model and sampling config are fixed, so the
+        # prompt + token budget fully determine the request
+        cache_key = hashlib.sha256(f"{max_tokens}|{prompt}".encode()).hexdigest()
+        cached = self._response_cache.get(cache_key)
+        if cached and cached[0] > time.time():
+            self.cache_stats['hits'] += 1
+            return cached[1]
+        self.cache_stats['misses'] += 1
+
+        # Single-flight: if another thread is already asking Gemini this
+        # exact prompt, wait for its answer instead of issuing a duplicate
+        with self._inflight_lock:
+            future = self._inflight.get(cache_key)
+            if future is None:
+                future = Future()
+                self._inflight[cache_key] = future
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            return future.result()
+
+        try:
+            result_text = self._request_once(prompt, max_tokens, cache_key)
+            future.set_result(result_text)
+            return result_text
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(cache_key, None)
+
+    def _request_once(self, prompt, max_tokens, cache_key):
+        """Issue one Gemini request and map the outcome to a message"""
+        import time
+
+        try:
+            url = f"{self.base_url}?key={self.api_key}"
+
+            payload = self._build_payload(prompt, max_tokens)
+
+            response = self._post(url, payload)
+
+            # httpx has no status-based retry; replay a transient failure
+            # through the Session, whose adapter backs off and retries
+            if self._http2 is not None and response.status_code in _RETRY_STATUSES:
+                if orjson is not None:
+                    response = self.session.post(url, data=orjson.dumps(payload), timeout=30)
                 else:
-                    print(f"Gemini API error: {response.status_code} - {response.text}")
-                    return f"Gemini API returned error {response.status_code}. Please try again later."
-                    
-            except requests.exceptions.Timeout:
-                print(f"Request timeout (attempt {attempt + 1}/{retry_count})")
-                if attempt < retry_count - 1:
-                    time.sleep(2)
-                    continue
+                    response = self.session.post(url, json=payload, timeout=30)
+
+            if response.status_code == 200:
+                if orjson is not None:
+                    result = orjson.loads(response.content)
                 else:
-                    return "Request timed out. Please check your internet connection and try again."
-                    
-            except Exception as e:
-                print(f"Error making Gemini request (attempt {attempt + 1}/{retry_count}): {e}")
-                if attempt < retry_count - 1:
-                    time.sleep(1)
-                    continue
+                    result = response.json()
+                if 'candidates' in result and len(result['candidates']) > 0:
+                    result_text = result['candidates'][0]['content']['parts'][0]['text']
+                    # Only successful completions are cached; errors and
+                    # fallback strings must stay retryable
+                    if len(self._response_cache) >= _CACHE_MAX:
+                        self._response_cache.pop(next(iter(self._response_cache)))
+                    self._response_cache[cache_key] = (time.time() + _CACHE_TTL, result_text)
+                    return result_text
                 else:
-                    return f"Unable to connect to Gemini API: {str(e)}"
-        
-        return "Failed to get response after multiple attempts. Please try again later."
+                    return "No response generated from Gemini API."
+
+            elif response.status_code == 503:
+                return "🤖 Gemini AI is currently experiencing high traffic. Please try again in a few minutes. The service should be available shortly."
+
+            elif response.status_code == 429:
+                return "API rate limit exceeded. Please wait a moment before trying again."
+
+            else:
+                # %-style args and a DEBUG gate keep the error body from
+                # being materialized unless someone is actually looking
+                logger.warning("Gemini API error %s", response.status_code)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Gemini error body: %s", response.text)
+                return f"Gemini API returned error {response.status_code}. Please try again later."
+
+        except _TIMEOUT_ERRORS:
+            logger.warning("Gemini request timed out after retries")
+            return "Request timed out. Please check your internet connection and try again."
+
+        except Exception as e:
+            logger.warning("Error making Gemini request: %s", e)
+            return f"Unable to connect to Gemini API: {str(e)}"
     
+    def _make_gemini_request_stream(self, prompt, max_tokens=500):
+        """Yield response text fragments as Gemini generates them
+
+        Uses the streamGenerateContent endpoint with SSE framing, so the
+        first tokens arrive after ~1 round trip instead of blocking until
+        the whole completion is finished.
+        """
+        if not self.is_available():
+            yield "AI service is not available. Please check Gemini API key configuration."
+            return
+
+        try:
+            url = f"{self.stream_url}?alt=sse&key={self.api_key}"
+            payload = self._build_payload(prompt, max_tokens)
+
+            response = self._post(url, payload, stream=True)
+
+            if response.status_code != 200:
+                yield f"Gemini API returned error {response.status_code}. Please try again later."
+                return
+
+            for line in response.iter_lines():
+                if not line or not line.startswith(b'data: '):
+                    continue
+                try:
+                    data = json.loads(line[6:])
+                    yield data['candidates'][0]['content']['parts'][0]['text']
+                except (ValueError, KeyError, IndexError):
+                    continue
+
+        except Exception as e:
+            yield f"Unable to connect to Gemini API: {str(e)}"
+
+    def query_content_stream(self, query, context, max_tokens=500):
+        """Streaming variant of query_content, yielding text fragments
+
+        For callers that forward tokens to a client as they arrive (SSE or
+        chunked responses). No caching or retry logic applies here - use
+        query_content for the blocking, cached path.
+        """
+        if not self.is_available():
+            yield self._provide_fallback_response(query, context)
+            return
+
+        window = self._select_context(query, context)
+
+        prompt = "".join((LLMService.QUERY_PREFIX, window,
+                          LLMService.QUERY_MID, query,
+                          LLMService.QUERY_SUFFIX))
+
+        yield from self._make_gemini_request_stream(prompt, max_tokens)
+
     def _provide_fallback_response(self, query, context):
         """Provide a basic fallback response when AI is unavailable"""
-        # Simple keyword matching for basic responses
+        # Simple keyword matching for basic responses; the lowercased context
+        # copy the old code built was never read, so it is gone
         query_lower = query.lower()
-        context_lower = context.lower()
-        
+
         # Basic keyword search
-        if any(word in query_lower for word in ['summary', 'summarize', 'what is', 'about']):
+        if LLMService.SUMMARY_RE.search(query_lower):
             # Try to extract first few sentences as a basic summary
             sentences = context[:500].split('.')[:3]
             return f"Based on the document content: {'. '.join(sentences)}..."
-        
-        elif any(word in query_lower for word in ['title', 'name', 'document']):
+
+        elif LLMService.TITLE_RE.search(query_lower):
             return "I can see document content is available, but AI processing is currently unavailable. Please try again later when the service is restored."
-        
-        elif any(word in query_lower for word in ['length', 'size', 'how long', 'how many']):
+
+        elif LLMService.SIZE_RE.search(query_lower):
             char_count = len(context)
             word_count = len(context.split())
             return f"Document statistics: approximately {word_count} words and {char_count} characters."
@@ -146,50 +426,212 @@ class LLMService:
         else:
             return f"I can see your question '{query}' relates to the document content, but AI processing is temporarily unavailable due to high demand. Please try again in a few minutes."
 
+    def _select_context(self, query, context, limit=4000):
+        """Build the prompt context window for a query
+
+        Short documents pass through whole. For longer ones, instead of
+        blindly taking the first `limit` chars, the text is split into
+        content-defined chunks (cached per document) and the chunks that
+        mention the query terms are packed into the window in document
+        order - fewer prompt tokens spent on irrelevant pages.
+        """
+        if len(context) <= limit:
+            return context
+
+        query_words = {w for w in re.findall(r'\w+', query.lower()) if len(w) > 2}
+        if not query_words:
+            return context[:limit]
+
+        try:
+            from services.pdf_service import split_chunks
+            chunks = split_chunks(context)
+        except Exception:
+            return context[:limit]
+
+        scored = []
+        for idx, chunk in enumerate(chunks):
+            chunk_lower = chunk.lower()
+            score = sum(chunk_lower.count(word) for word in query_words)
+            if score:
+                scored.append((score, idx))
+
+        if not scored:
+            return context[:limit]
+
+        # Best-scoring chunks first until the window is full, then restore
+        # document order so the excerpt still reads coherently
+        scored.sort(reverse=True)
+        picked = []
+        used = 0
+        for score, idx in scored:
+            size = len(chunks[idx]) + 2
+            if used + size > limit:
+                continue
+            picked.append(idx)
+            used += size
+            if used >= limit:
+                break
+
+        if not picked:
+            return context[:limit]
+
+        picked.sort()
+        return '\n\n'.join(chunks[idx] for idx in picked)
+
     def query_content(self, query, context, max_tokens=500):
         """Query content using Gemini LLM with fallback"""
+
+        # Deterministic cases first - these never need (or deserve) a paid
+        # 1-5s API round trip
+        if not context or not context.strip():
+            return "No document content is available to answer this question."
+
+        if len(query) > 2000:
+            return "Query is too long. Please ask a shorter, more specific question."
+
+        query_lower = query.lower()
+        if LLMService.SIZE_RE.search(query_lower) and LLMService.DOC_REF_RE.search(query_lower):
+            char_count = len(context)
+            word_count = len(context.split())
+            return f"Document statistics: approximately {word_count} words and {char_count} characters."
+
         if not self.is_available():
             return self._provide_fallback_response(query, context)
         
         try:
-            # Prepare prompt
-            prompt = f"""Based on the following document content, please answer the user's question.
+            # Semantic cache probe: a paraphrase of an earlier question about
+            # the same document is answered from memory. Keyed per document
+            # (hash of the context window) so answers never cross documents.
+            window = self._select_context(query, context)
 
-Document Content:
-{context[:4000]}
+            context_key = None
+            q_emb = None
+            model = _get_sem_model()
+            if model is not None:
+                context_key = hashlib.sha256(window.encode()).hexdigest()
+                q_emb = model.encode(query)
+                q_emb = q_emb / (numpy.linalg.norm(q_emb) or 1.0)
+                for key, emb, cached_response in self._sem_entries:
+                    if key == context_key and float(emb @ q_emb) > _SEM_THRESHOLD:
+                        self.cache_stats['hits'] += 1
+                        return cached_response
 
-User Question: {query}
-
-Please provide a clear, concise answer based on the document content. If the answer cannot be found in the document, please say so."""
+            # Prepare prompt
+            prompt = "".join((LLMService.QUERY_PREFIX, window,
+                              LLMService.QUERY_MID, query,
+                              LLMService.QUERY_SUFFIX))
 
             response = self._make_gemini_request(prompt, max_tokens)
-            
+
             # If response indicates API issues, provide fallback
             if any(phrase in response.lower() for phrase in ['overloaded', 'high traffic', 'try again', 'unavailable']):
                 return f"🤖 {response}\n\n📄 **Fallback Info**: {self._provide_fallback_response(query, context)}"
-            
+
+            # Remember the answer for near-duplicate questions, oldest out
+            # first - but never failure messages, which would otherwise be
+            # served as answers with no TTL
+            if q_emb is not None and not _is_error_response(response):
+                if len(self._sem_entries) >= _SEM_MAX:
+                    self._sem_entries.pop(0)
+                self._sem_entries.append((context_key, q_emb, response))
+
             return response
-            
+
         except Exception as e:
-            print(f"Error in query_content: {e}")
+            logger.warning("Error in query_content: %s", e)
             return self._provide_fallback_response(query, context)
     
+    def query_content_batch(self, queries, context, max_tokens=500):
+        """Answer several questions about one document in a single request
+
+        Packing the questions into one prompt sends the shared context once
+        and counts once against the requests-per-minute quota, instead of a
+        full round trip (and a re-sent context) per question.
+        """
+        queries = list(queries)
+        if not queries:
+            return []
+        if len(queries) == 1:
+            return [self.query_content(queries[0], context, max_tokens)]
+        if not self.is_available():
+            return [self._provide_fallback_response(q, context) for q in queries]
+
+        try:
+            numbered = "\n".join(f"{i + 1}. {q}" for i, q in enumerate(queries))
+            prompt = f"""Based on the following document content, answer each numbered question.
+
+Document Content:
+{context[:4000]}
+
+Questions:
+{numbered}
+
+Return ONLY a JSON array of exactly {len(queries)} answer strings, one per question, in order."""
+
+            response = self._make_gemini_request(prompt, max_tokens * len(queries))
+
+            # Pull the JSON array out of the response (models sometimes wrap
+            # it in prose or code fences)
+            answers = None
+            start = response.find('[')
+            end = response.rfind(']')
+            if start != -1 and end > start:
+                try:
+                    answers = json.loads(response[start:end + 1])
+                except ValueError:
+                    answers = None
+
+            if isinstance(answers, list) and len(answers) == len(queries):
+                return [str(answer) for answer in answers]
+
+            # Model didn't follow the format - fall back to one call each
+            return [self.query_content(q, context, max_tokens) for q in queries]
+
+        except Exception as e:
+            logger.warning("Error in query_content_batch: %s", e)
+            return [self._provide_fallback_response(q, context) for q in queries]
+
+    def query_content_iter(self, query, context_parts, max_tokens=500):
+        """Query content from an iterable of context chunks
+
+        Saves callers from joining every document into one giant string;
+        chunks are written into a single bounded buffer here, stopping as
+        soon as the prompt context window is full.
+        """
+        import io
+
+        buffer = io.StringIO()
+        remaining = 4000  # Same context cap applied by query_content
+        for part in context_parts:
+            if remaining <= 0:
+                break
+            if not part:
+                continue
+            if buffer.tell() > 0:
+                buffer.write("\n\n")
+                remaining -= 2
+                # The separator may have spent the last of the budget; a
+                # negative value here would slice part[:-1] and bust the cap
+                if remaining <= 0:
+                    break
+            buffer.write(part[:remaining])
+            remaining -= len(part)
+
+        return self.query_content(query, buffer.getvalue(), max_tokens)
+
     def generate_summary(self, content, max_tokens=300):
         """Generate summary of document content"""
         if not self.is_available():
             return "AI service is not available. Please check Gemini API key configuration."
         
         try:
-            prompt = f"""Please provide a concise summary of the following document content:
-
-{content[:4000]}
-
-Summary should be informative and capture the main points of the document."""
+            prompt = "".join((LLMService.SUMMARY_PREFIX, content[:4000],
+                              LLMService.SUMMARY_SUFFIX))
 
             return self._make_gemini_request(prompt, max_tokens)
             
         except Exception as e:
-            print(f"Error generating summary: {e}")
+            logger.warning("Error generating summary: %s", e)
             return f"Error generating summary: {str(e)}"
     
     def extract_keywords(self, content, max_tokens=100):
@@ -198,30 +640,46 @@ Summary should be informative and capture the main points of the document."""
             return []
         
         try:
-            prompt = f"""Extract the most important keywords and phrases from the following document content. Return them as a comma-separated list:
-
-{content[:4000]}
-
-Keywords:"""
+            prompt = "".join((LLMService.KEYWORDS_PREFIX, content[:4000],
+                              LLMService.KEYWORDS_SUFFIX))
 
             response = self._make_gemini_request(prompt, max_tokens)
             
-            # Parse the response to extract keywords
+            # Parse the response to extract keywords; islice stops after the
+            # 10 we keep instead of materializing every candidate first, and
+            # empty entries (trailing commas etc.) are dropped
             if response and "Error" not in response:
-                keywords = [keyword.strip() for keyword in response.split(',')]
-                return keywords[:10]  # Limit to 10 keywords
+                stripped = (keyword.strip() for keyword in response.split(','))
+                return list(islice((k for k in stripped if k), 10))
             else:
                 return []
                 
         except Exception as e:
-            print(f"Error extracting keywords: {e}")
+            logger.warning("Error extracting keywords: %s", e)
             return []
     
+    def analyze_document(self, content, summary_tokens=300, keyword_tokens=100):
+        """Generate summary and keywords concurrently
+
+        The two calls are independent HTTP round trips, so overlapping them
+        makes the stage cost the slower of the two instead of their sum.
+
+        Returns:
+            tuple: (summary, keywords)
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            summary_future = executor.submit(self.generate_summary, content, summary_tokens)
+            keywords_future = executor.submit(self.extract_keywords, content, keyword_tokens)
+            return summary_future.result(), keywords_future.result()
+
     def get_model_info(self):
         """Get information about the current model"""
         return {
             "provider": "Google",
             "model": "Gemini Pro",
             "api_url": self.base_url,
-            "available": self.is_available()
+            "available": self.is_available(),
+            "cache_stats": dict(self.cache_stats)
         }
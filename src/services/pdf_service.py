@@ -1,6 +1,116 @@
 import PyPDF2
-import io
+import hashlib
 import os
+import shutil
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+# PyPDF2 page extraction is pure-Python CPU work; beyond this many pages the
+# process-pool startup cost is worth paying to use all cores
+_PARALLEL_PAGE_MIN = 8
+
+def _extract_page(file_path, page_num):
+    """Extract one page's text (top-level so worker processes can pickle it)"""
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        return pdf_reader.pages[page_num].extract_text()
+
+@lru_cache(maxsize=256)
+def _get_pdf_info_cached(file_path, mtime):
+    """Parse PDF metadata, memoized per (path, mtime)"""
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+
+        info = {
+            'num_pages': len(pdf_reader.pages),
+            'title': '',
+            'author': '',
+            'subject': '',
+            'creator': '',
+            'producer': '',
+            'creation_date': None,
+            'modification_date': None
+        }
+
+        # Get metadata if available
+        if pdf_reader.metadata:
+            metadata = pdf_reader.metadata
+            info.update({
+                'title': metadata.get('/Title', ''),
+                'author': metadata.get('/Author', ''),
+                'subject': metadata.get('/Subject', ''),
+                'creator': metadata.get('/Creator', ''),
+                'producer': metadata.get('/Producer', ''),
+                'creation_date': metadata.get('/CreationDate'),
+                'modification_date': metadata.get('/ModDate')
+            })
+
+        return info
+
+@lru_cache(maxsize=256)
+def _validate_pdf_cached(file_path, mtime):
+    """Open-and-parse validation, memoized per (path, mtime)"""
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        # Try to access first page to validate
+        if len(pdf_reader.pages) > 0:
+            pdf_reader.pages[0]
+        return True
+
+def _extract_parallel(file_path, num_pages):
+    """Extract all pages across a process pool, preserving page order"""
+    workers = min(os.cpu_count() or 1, num_pages)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pages = executor.map(_extract_page, [file_path] * num_pages, range(num_pages))
+        return "\n".join(pages)
+
+try:
+    # PyMuPDF parses in C and is typically 5-20x faster than PyPDF2
+    import pymupdf
+except ImportError:
+    pymupdf = None
+
+try:
+    # pypdfium2 (PDFium bindings) is the second-choice C backend; unlike
+    # PyMuPDF it is permissively licensed, so deployments that cannot ship
+    # AGPL code still get native-speed extraction
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+# Chunk lists per document text hash so repeated queries against the same
+# document reuse the split instead of rescanning megabytes of text
+_chunk_cache = {}
+_CHUNK_CACHE_MAX = 64
+
+def split_chunks(text, boundary_mod=64):
+    """Split text into content-defined chunks
+
+    A boundary is cut after any line whose CRC32 % boundary_mod == 0, so the
+    same passage always lands in the same chunk no matter what precedes it
+    (unlike fixed-size splits, which shift on any upstream edit).
+    """
+    key = hashlib.sha256(text.encode()).hexdigest()
+    cached = _chunk_cache.get(key)
+    if cached is not None:
+        return cached
+
+    chunks = []
+    current = []
+    for line in text.splitlines():
+        current.append(line)
+        if zlib.crc32(line.encode()) % boundary_mod == 0:
+            chunks.append('\n'.join(current))
+            current = []
+    if current:
+        chunks.append('\n'.join(current))
+
+    if len(_chunk_cache) >= _CHUNK_CACHE_MAX:
+        _chunk_cache.pop(next(iter(_chunk_cache)))
+    _chunk_cache[key] = chunks
+    return chunks
 
 class PDFService:
     """Service for handling PDF operations"""
@@ -13,19 +123,39 @@ class PDFService:
         try:
             if not os.path.exists(file_path):
                 raise FileNotFoundError(f"File not found: {file_path}")
-            
-            text_content = ""
-            
+
+            # Prefer the PyMuPDF backend when it is installed
+            if pymupdf is not None:
+                with pymupdf.open(file_path) as doc:
+                    return "\n".join(page.get_text("text") for page in doc).strip()
+
+            if pdfium is not None:
+                doc = pdfium.PdfDocument(file_path)
+                try:
+                    return "\n".join(
+                        page.get_textpage().get_text_range() for page in doc
+                    ).strip()
+                finally:
+                    doc.close()
+
             with open(file_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
-                
-                # Extract text from all pages
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    text_content += page.extract_text() + "\n"
-            
-            return text_content.strip()
-            
+                num_pages = len(pdf_reader.pages)
+
+            # Large PDFs fan pages out across cores; PyPDF2 decodes content
+            # streams in Python, so this is genuinely CPU-bound
+            if num_pages >= _PARALLEL_PAGE_MIN:
+                return _extract_parallel(file_path, num_pages).strip()
+
+            with open(file_path, 'rb') as file:
+                pdf_reader = PyPDF2.PdfReader(file)
+
+                # Collect pages and join once - += on the accumulator copies
+                # the whole buffer per page, which goes quadratic on big PDFs
+                parts = [page.extract_text() for page in pdf_reader.pages]
+
+            return "\n".join(parts).strip()
+
         except Exception as e:
             print(f"Error extracting text from PDF: {str(e)}")
             return ""
@@ -33,21 +163,50 @@ class PDFService:
     def extract_text_from_upload(self, file_obj):
         """Extract text content from uploaded file object"""
         try:
-            text_content = ""
-            
-            # Read file content into bytes
-            file_content = file_obj.read()
+            # Spool the upload: small files stay in an 8MB RAM buffer, big
+            # ones spill to disk instead of sitting resident as a full bytes
+            # copy for the life of the request
+            spooled = tempfile.SpooledTemporaryFile(max_size=8 << 20)
+            shutil.copyfileobj(file_obj, spooled, 1 << 20)
             file_obj.seek(0)  # Reset file pointer
-            
-            # Create PDF reader from bytes
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-            
-            # Extract text from all pages
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text_content += page.extract_text() + "\n"
-            
-            return text_content.strip()
+            spooled.seek(0)
+
+            # Prefer the PyMuPDF backend when it is installed; it wants a
+            # contiguous buffer, so the spool is read back for it
+            if pymupdf is not None:
+                with pymupdf.open(stream=spooled.read(), filetype="pdf") as doc:
+                    return "\n".join(page.get_text("text") for page in doc).strip()
+
+            if pdfium is not None:
+                doc = pdfium.PdfDocument(spooled)
+                try:
+                    return "\n".join(
+                        page.get_textpage().get_text_range() for page in doc
+                    ).strip()
+                finally:
+                    doc.close()
+
+            # PyPDF2 reads from the spooled file-like directly
+            pdf_reader = PyPDF2.PdfReader(spooled)
+            num_pages = len(pdf_reader.pages)
+
+            # Spill big uploads to a named temp file so worker processes can
+            # open the PDF themselves and extract pages in parallel
+            if num_pages >= _PARALLEL_PAGE_MIN:
+                tmp = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
+                try:
+                    spooled.seek(0)
+                    shutil.copyfileobj(spooled, tmp, 1 << 20)
+                    tmp.close()
+                    return _extract_parallel(tmp.name, num_pages).strip()
+                finally:
+                    os.unlink(tmp.name)
+
+            # Collect pages and join once - += on the accumulator copies the
+            # whole buffer per page, which goes quadratic on big PDFs
+            parts = [page.extract_text() for page in pdf_reader.pages]
+
+            return "\n".join(parts).strip()
             
         except Exception as e:
             print(f"Error extracting text from uploaded PDF: {str(e)}")
@@ -58,36 +217,12 @@ class PDFService:
         try:
             if not os.path.exists(file_path):
                 raise FileNotFoundError(f"File not found: {file_path}")
-            
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                info = {
-                    'num_pages': len(pdf_reader.pages),
-                    'title': '',
-                    'author': '',
-                    'subject': '',
-                    'creator': '',
-                    'producer': '',
-                    'creation_date': None,
-                    'modification_date': None
-                }
-                
-                # Get metadata if available
-                if pdf_reader.metadata:
-                    metadata = pdf_reader.metadata
-                    info.update({
-                        'title': metadata.get('/Title', ''),
-                        'author': metadata.get('/Author', ''),
-                        'subject': metadata.get('/Subject', ''),
-                        'creator': metadata.get('/Creator', ''),
-                        'producer': metadata.get('/Producer', ''),
-                        'creation_date': metadata.get('/CreationDate'),
-                        'modification_date': metadata.get('/ModDate')
-                    })
-                
-                return info
-                
+
+            # mtime keys the cache, so a rewritten file is re-parsed; a copy
+            # is returned so callers can't mutate the cached dict
+            info = _get_pdf_info_cached(file_path, os.path.getmtime(file_path))
+            return dict(info)
+
         except Exception as e:
             print(f"Error getting PDF info: {str(e)}")
             return {
@@ -100,17 +235,12 @@ class PDFService:
                 'creation_date': None,
                 'modification_date': None
             }
-    
+
     def validate_pdf(self, file_path):
         """Validate if file is a proper PDF"""
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                # Try to access first page to validate
-                if len(pdf_reader.pages) > 0:
-                    pdf_reader.pages[0]
-                return True
-                
+            return _validate_pdf_cached(file_path, os.path.getmtime(file_path))
+
         except Exception as e:
             print(f"PDF validation failed: {str(e)}")
             return False
@@ -6,6 +6,9 @@ Test the documents endpoint directly
 import requests
 import json
 
+# Session gives keep-alive across requests, same as security_test.py
+session = requests.Session()
+
 def test_documents_endpoint():
     """Test the documents API endpoint"""
     
@@ -17,7 +20,7 @@ def test_documents_endpoint():
     try:
         # Test the documents endpoint
         print("📡 Testing GET /api/documents...")
-        response = requests.get(f"{base_url}/api/documents", timeout=10)
+        response = session.get(f"{base_url}/api/documents", timeout=10)
         
         print(f"Status Code: {response.status_code}")
         print(f"Response Headers: {dict(response.headers)}")
@@ -2,6 +2,9 @@
 """Test upload endpoint with a simple PDF"""
 import requests
 import io
+
+# Session gives keep-alive across requests, same as security_test.py
+session = requests.Session()
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 
@@ -28,7 +31,7 @@ def test_upload():
         }
         
         # Make the request
-        response = requests.post('http://127.0.0.1:5000/api/upload', files=files)
+        response = session.post('http://127.0.0.1:5000/api/upload', files=files)
         
         print(f"Status Code: {response.status_code}")
         print(f"Response: {response.text}")
@@ -0,0 +1,84 @@
+"""
+Small shared helpers for the API routes
+"""
+import time
+from datetime import datetime
+from functools import lru_cache
+
+from flask import current_app, jsonify
+
+# (whole second, formatted string) for iso_now
+_iso_cache = [0, '']
+
+
+def iso_now():
+    """ISO timestamp string, cached per wall-clock second
+
+    Constructing and formatting a datetime on every request adds up under
+    load; within the same second the previous string is reused.
+    """
+    second = int(time.time())
+    if second != _iso_cache[0]:
+        _iso_cache[0] = second
+        _iso_cache[1] = datetime.fromtimestamp(second).isoformat()
+    return _iso_cache[1]
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Optional - fall back to Flask's jsonify
+
+# Tiny TTL cache for /api/documents/stats; dashboards poll it far more
+# often than the numbers actually change. It lives here (not app_simple)
+# so the stats route and the upload/delete invalidators share one copy:
+# under `python app_simple.py` the routes run in __main__, and importing
+# app_simple by name would re-execute the module and touch a second,
+# unused cache.
+stats_cache = {'t': 0, 'v': None}
+STATS_TTL = 5  # seconds
+
+
+def invalidate_stats_cache():
+    """Drop the cached stats after an upload or delete changes them"""
+    stats_cache['t'] = 0
+
+
+@lru_cache(maxsize=1024)
+def split_tags(tags):
+    """Split a comma-separated tags string into a tuple
+
+    Tag strings repeat across rows and requests, so the split result is
+    memoized. A tuple (not a list) is returned so cached values cannot be
+    mutated by callers; it serializes to a JSON array either way.
+    """
+    return tuple(tags.split(',')) if tags else ()
+
+
+def content_preview(preview, content_len):
+    """Build the bounded content preview for list responses
+
+    The SQL layer selects at most 201 chars, so the slice here works on a
+    bounded input instead of rescanning a full document. The ellipsis is
+    only added when the stored content really was longer than 200 chars.
+    """
+    if preview and content_len > 200:
+        return preview[:200] + '...'
+    return preview
+
+
+def ojson(obj, status=200):
+    """Build a JSON response, using orjson when it is installed
+
+    orjson serializes large text payloads (like content previews) several
+    times faster than the stdlib json module used by jsonify.
+    """
+    if orjson is None:
+        response = jsonify(obj)
+        response.status_code = status
+        return response
+
+    return current_app.response_class(
+        orjson.dumps(obj),
+        status=status,
+        mimetype='application/json'
+    )